@@ -3,6 +3,8 @@ import asyncio, os
 from agents import Agent, Runner
 from agents.mcp import MCPServerStreamableHttp
 
+from local_triage import make_http_client
+
 LOG_PATH = os.path.abspath("sample.log")
 
 async def maybe_close(obj):
@@ -17,7 +19,8 @@ async def maybe_close(obj):
 async def main():
     mcp_server = MCPServerStreamableHttp(
         name="log-mcp",
-        params={"url": "http://localhost:8000/mcp"},
+        # pooled keep-alive client instead of the SDK default
+        params={"url": "http://localhost:8000/mcp", "httpx_client_factory": make_http_client},
     )
 
     await mcp_server.connect()
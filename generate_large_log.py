@@ -1,62 +1,57 @@
-import random
-import uuid
-from datetime import datetime, timedelta
+import numpy as np
 
 OUTPUT_FILE = "large_sample.log"
 TOTAL_LINES = 15000
+WRITE_BUFFER = 1 << 20  # explicit 1 MB BufferedWriter
+WRITE_BATCH = 32768  # events joined per write() call, ~3 MB of text
 
-start_time = datetime(2026, 2, 18, 10, 0, 0)
+start_time = np.datetime64("2026-02-18T10:00:00")
 
 redis_nodes = ["10.0.0.4", "10.0.0.7", "10.0.0.9"]
 db_hosts = ["db-prod-01", "db-prod-02"]
 workers = ["worker-1", "worker-2", "worker-3"]
 
-def random_ts(offset_seconds):
-    return (start_time + timedelta(seconds=offset_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+rng = np.random.default_rng()
 
-def random_request():
-    return f"req-{uuid.uuid4().hex[:8]}"
-
-def random_order():
-    return random.randint(80000, 99999)
-
-def random_user():
-    return random.randint(1000, 5000)
-
-lines = []
-for i in range(TOTAL_LINES):
-    ts = random_ts(i)
-    req = random_request()
+# Every per-event random value is drawn up front in a handful of vectorized calls
+ts = [t.replace("T", " ") for t in np.datetime_as_string(start_time + np.arange(TOTAL_LINES)).tolist()]
+req = [f"req-{r:08x}" for r in rng.integers(0, 1 << 32, TOTAL_LINES).tolist()]
+orders = rng.integers(80000, 100000, TOTAL_LINES).tolist()
+users = rng.integers(1000, 5001, TOTAL_LINES).tolist()
+ips = rng.choice(redis_nodes, TOTAL_LINES).tolist()
+hosts = rng.choice(db_hosts, TOTAL_LINES).tolist()
+nodes = rng.choice(workers, TOTAL_LINES).tolist()
+usages = rng.integers(90, 99, TOTAL_LINES).tolist()
 
+# Scenario per event, with the same odds as the old chain of nested random() checks
+SCENARIOS = (
     # 70% normal traffic
-    if random.random() < 0.7:
-        lines.append(f"{ts} INFO Checkout start order_id={random_order()} user_id={random_user()} request_id={req}")
-
-    # 10% redis issues
-    elif random.random() < 0.5:
-        ip = random.choice(redis_nodes)
-        lines.append(f"{ts} ERROR Timeout connecting to redis at {ip}:6379 request_id={req}")
-        lines.append(f"{ts} WARN Retrying cache read attempt=1 request_id={req}")
-
-    # 10% db issues
-    elif random.random() < 0.7:
-        host = random.choice(db_hosts)
-        lines.append(f"{ts} ERROR Database connection refused host={host} port=5432 request_id={req}")
-
-    # 7% upstream failures
-    elif random.random() < 0.9:
-        lines.append(f"{ts} ERROR HTTP 500 returned from upstream service billing-api request_id={req}")
-        lines.append(f"{ts} WARN Retry attempt=1 request_id={req}")
-
-    # 3% disk pressure events
-    else:
-        worker = random.choice(workers)
-        usage = random.randint(90, 98)
-        lines.append(f"{ts} ERROR Disk space critical on node={worker} usage={usage}%")
-        lines.append(f"{ts} FATAL Service shutting down due to disk pressure node={worker}")
-
-with open(OUTPUT_FILE, "w") as f:
-    for line in lines:
-        f.write(line + "\n")
-
-print(f"Generated {len(lines)} lines in {OUTPUT_FILE}")
+    (0.7, lambda i: f"{ts[i]} INFO Checkout start order_id={orders[i]} user_id={users[i]} request_id={req[i]}"),
+    # 15% redis issues
+    (0.15, lambda i: f"{ts[i]} ERROR Timeout connecting to redis at {ips[i]}:6379 request_id={req[i]}\n"
+                     f"{ts[i]} WARN Retrying cache read attempt=1 request_id={req[i]}"),
+    # 10.5% db issues
+    (0.105, lambda i: f"{ts[i]} ERROR Database connection refused host={hosts[i]} port=5432 request_id={req[i]}"),
+    # 4.05% upstream failures
+    (0.0405, lambda i: f"{ts[i]} ERROR HTTP 500 returned from upstream service billing-api request_id={req[i]}\n"
+                       f"{ts[i]} WARN Retry attempt=1 request_id={req[i]}"),
+    # 0.45% disk pressure events
+    (0.0045, lambda i: f"{ts[i]} ERROR Disk space critical on node={nodes[i]} usage={usages[i]}%\n"
+                       f"{ts[i]} FATAL Service shutting down due to disk pressure node={nodes[i]}"),
+)
+scenario = rng.choice(len(SCENARIOS), TOTAL_LINES, p=[p for p, _ in SCENARIOS])
+
+events = np.empty(TOTAL_LINES, dtype=object)
+for k, (_, render) in enumerate(SCENARIOS):
+    rows = np.flatnonzero(scenario == k)
+    events[rows] = [render(i) for i in rows.tolist()]
+
+# Join and encode in bounded batches so memory stays flat when TOTAL_LINES grows
+line_count = 0
+with open(OUTPUT_FILE, "wb", buffering=WRITE_BUFFER) as f:
+    for start in range(0, TOTAL_LINES, WRITE_BATCH):
+        chunk = ("\n".join(events[start:start + WRITE_BATCH]) + "\n").encode()
+        line_count += chunk.count(b"\n")
+        f.write(chunk)
+
+print(f"Generated {line_count} lines in {OUTPUT_FILE}")
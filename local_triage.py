@@ -6,7 +6,7 @@ Runs log triage via your local MCP server (no OpenAI calls):
 - Calls MCP tools: analyze_levels, cluster_errors, make_graph
 - Prints a table of log levels (counts + %)
 - Prints top error clusters with examples
-- Prints where the graph PNG was saved
+- Prints where the graph SVG was saved
 
 Usage:
   python3 local_triage.py
@@ -15,15 +15,39 @@ Usage:
 
 import argparse
 import asyncio
+import importlib.util
 import json
 import os
-from typing import Any, Dict
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional
 
+import httpx
 import pandas as pd
 
-from mcp.client.streamable_http import streamablehttp_client
+from mcp.client.streamable_http import streamable_http_client
 from mcp import ClientSession
 
+# Keep-alive pool shared by every MCP request in the process, so tool calls reuse one TCP (+TLS) connection.
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+# Same defaults the MCP SDK's own client uses: 30s per operation, 5 min read for long-lived streams
+HTTP_TIMEOUT = httpx.Timeout(30.0, read=300.0)
+
+
+def make_http_client(
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[httpx.Timeout] = None,
+    auth: Optional[httpx.Auth] = None,
+) -> httpx.AsyncClient:
+    """Pooled AsyncClient; signature matches the MCP SDK's httpx_client_factory so it can be passed there too."""
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout or HTTP_TIMEOUT,
+        auth=auth,
+        limits=HTTP_LIMITS,
+        # HTTP/2 is negotiated over TLS only, and needs the optional h2 package
+        http2=importlib.util.find_spec("h2") is not None,
+    )
+
 
 def extract_json(tool_result) -> Dict[str, Any]:
     content = getattr(tool_result, "content", None)
@@ -75,22 +99,90 @@ def extract_json(tool_result) -> Dict[str, Any]:
     raise RuntimeError(f"Unable to extract JSON from tool_result. last_err={last_err!r} content={content!r}")
 
 
-async def run_triage(log_path: str, mcp_url: str, bin_minutes: int, threshold: float, top_k: int, examples_each: int):
+class MCPSessionPool:
+    """Live ClientSessions keyed by server URL, so repeated triage runs skip initialize/teardown.
+
+    Each session's transport is held open by its own AsyncExitStack and closed deterministically
+    by aclose() (or leaving ``async with``). Use the pool from a single task.
+    """
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None, health_timeout: float = 5.0):
+        self._http_client = http_client
+        self._health_timeout = health_timeout
+        self._sessions: Dict[str, ClientSession] = {}
+        self._stacks: Dict[str, AsyncExitStack] = {}
+
+    async def acquire(self, url: str) -> ClientSession:
+        session = self._sessions.get(url)
+        if session is not None:
+            try:
+                # Cheap round trip to make sure the server still knows this session
+                await asyncio.wait_for(session.list_tools(), self._health_timeout)
+                return session
+            except Exception:
+                await self._discard(url)
+
+        stack = AsyncExitStack()
+        try:
+            # streamable_http_client returns (read, write, get_session_id); a caller-provided client is left open
+            read, write, _ = await stack.enter_async_context(
+                streamable_http_client(url, http_client=self._http_client)
+            )
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+        except BaseException:
+            await stack.aclose()
+            raise
+
+        self._sessions[url] = session
+        self._stacks[url] = stack
+        return session
+
+    async def _discard(self, url: str):
+        self._sessions.pop(url, None)
+        stack = self._stacks.pop(url, None)
+        if stack is not None:
+            try:
+                await stack.aclose()
+            except Exception:
+                pass
+
+    async def aclose(self):
+        for url in list(self._stacks):
+            await self._discard(url)
+
+    async def __aenter__(self) -> "MCPSessionPool":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+async def run_triage(
+    log_path: str,
+    mcp_url: str,
+    bin_minutes: int,
+    threshold: float,
+    top_k: int,
+    examples_each: int,
+    pool: Optional[MCPSessionPool] = None,
+):
     if not os.path.exists(log_path):
         raise FileNotFoundError(f"Log file not found: {log_path}")
 
-    # streamablehttp_client returns (read, write, get_session_id) in current SDKs
-    async with streamablehttp_client(mcp_url) as (read, write, _):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
+    async with AsyncExitStack() as stack:
+        if pool is None:
+            # One-shot run: the session lives only for this call
+            pool = await stack.enter_async_context(MCPSessionPool())
+        session = await pool.acquire(mcp_url)
 
-            levels_res = await session.call_tool(
+        # The three tools are independent; the server runs each in a worker thread, so their work overlaps
+        levels_res, clusters_res, graph_res = await asyncio.gather(
+            session.call_tool(
                 "analyze_levels",
                 {"log_path": log_path, "bin_minutes": bin_minutes},
-            )
-            levels_obj = extract_json(levels_res)
-
-            clusters_res = await session.call_tool(
+            ),
+            session.call_tool(
                 "cluster_errors",
                 {
                     "log_path": log_path,
@@ -98,14 +190,16 @@ async def run_triage(log_path: str, mcp_url: str, bin_minutes: int, threshold: f
                     "top_k": top_k,
                     "examples_each": examples_each,
                 },
-            )
-            clusters_obj = extract_json(clusters_res)
-
-            graph_res = await session.call_tool(
+            ),
+            session.call_tool(
                 "make_graph",
-                {"log_path": log_path, "out_path": "log_levels.png"},
-            )
-            graph_obj = extract_json(graph_res)
+                {"log_path": log_path, "out_path": "log_levels.svg"},
+            ),
+        )
+
+    levels_obj = extract_json(levels_res)
+    clusters_obj = extract_json(clusters_res)
+    graph_obj = extract_json(graph_res)
 
     return levels_obj, clusters_obj, graph_obj
 
@@ -125,11 +219,11 @@ def print_results(levels_obj: Dict[str, Any], clusters_obj: Dict[str, Any], grap
         print(df.to_string(index=False))
 
     # Optional: time bins summary
-    time_bins = levels_obj.get("time_bins", {})
+    time_bins = levels_obj.get("time_bins", [])
     if time_bins:
         print("\n=== EVENT VOLUME BY TIME BIN ===")
         # show up to top 12 bins by count
-        top_bins = sorted(time_bins.items(), key=lambda kv: kv[1], reverse=True)[:12]
+        top_bins = sorted(time_bins, key=lambda kv: kv[1], reverse=True)[:12]
         for ts, c in top_bins:
             print(f"{ts}  count={c}")
 
@@ -148,7 +242,7 @@ def print_results(levels_obj: Dict[str, Any], clusters_obj: Dict[str, Any], grap
     if out_path:
         print(f"\n=== GRAPH SAVED ===\n{out_path}")
     else:
-        print("\n=== GRAPH SAVED ===\n(log_levels.png)")
+        print("\n=== GRAPH SAVED ===\n(log_levels.svg)")
 
 
 def main():
@@ -161,16 +255,19 @@ def main():
     ap.add_argument("--examples", type=int, default=2, help="Examples per cluster (default: 2)")
     args = ap.parse_args()
 
-    levels_obj, clusters_obj, graph_obj = asyncio.run(
-        run_triage(
-            log_path=os.path.abspath(args.log),
-            mcp_url=args.url,
-            bin_minutes=args.bin_minutes,
-            threshold=args.threshold,
-            top_k=args.top_k,
-            examples_each=args.examples,
-        )
-    )
+    async def triage():
+        async with make_http_client() as http_client, MCPSessionPool(http_client) as pool:
+            return await run_triage(
+                log_path=os.path.abspath(args.log),
+                mcp_url=args.url,
+                bin_minutes=args.bin_minutes,
+                threshold=args.threshold,
+                top_k=args.top_k,
+                examples_each=args.examples,
+                pool=pool,
+            )
+
+    levels_obj, clusters_obj, graph_obj = asyncio.run(triage())
 
     print_results(levels_obj, clusters_obj, graph_obj)
 
@@ -0,0 +1,128 @@
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import server
+
+LEVEL_RE = re.compile(r"\b(INFO|WARN|WARNING|ERROR|FATAL|DEBUG|TRACE)\b", re.IGNORECASE)
+TS_RE = re.compile(r"(?P<ts>\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})")
+
+def original_normalize(line: str) -> str:
+    """normalize as first written: one substitution pass per token kind."""
+    s = line
+    s = TS_RE.sub("<TS>", s)
+    s = LEVEL_RE.sub("<LEVEL>", s)
+    s = re.sub(r"\b0x[0-9a-fA-F]+\b", "<HEX>", s)
+    s = re.sub(r"\b\d+\b", "<NUM>", s)
+    s = re.sub(r"(https?://\S+)", "<URL>", s)
+    s = re.sub(r"(/[A-Za-z0-9._-]+)+", "<PATH>", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def write_log(tmp_path, lines, name="app.log"):
+    path = tmp_path / name
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+@pytest.mark.parametrize("line", [
+    "2026-02-18 10:02:12 ERROR Timeout connecting to redis at 10.0.0.4:6379 request_id=req-001",
+    "2026-02-18T10:02:12 warn GET https://api.example.com/v1/users/42?x=1 failed",
+    "FATAL open /var/log/app-3/error.log: errno 0x1F",
+    "ERROR /tmp/ERROR/42/x0x1f/https://host/a b",
+    "info\tmulti   space\r\n trailing ",
+    "path/with/num1/and/0x2a/and/INFO/segments",
+])
+def test_normalize_matches_original(line):
+    assert server.normalize(line) == original_normalize(line)
+
+def test_normalize_matches_original_fuzz():
+    rng = random.Random(0)
+    pieces = ["/", "a", "Z", "_", ".", "-", "0", "7", "0x", "f", " ", "\t", ":", "http://", "https://",
+              "INFO", "warn", "Error", "2026-02-18 10:02:12", "2026-02-18T10:02:12", "=", "?"]
+    for _ in range(20000):
+        line = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        assert server.normalize(line) == original_normalize(line), line
+
+def test_parse_epochs_matches_strptime():
+    rng = random.Random(0)
+    stamps = ["", "2024-02-29 23:59:59", "2023-02-29 00:00:00", "1900-02-29 00:00:00", "2000-02-29 00:00:00",
+              "2026-04-31 12:00:00", "2026-12-31 24:00:00", "2026-01-01 00:60:00", "2026-01-01 00:00:60",
+              "0000-01-01 00:00:00", "0001-01-01 00:00:00", "9999-12-31 23:59:59", "2026-13-01 00:00:00",
+              "2026-00-10 00:00:00", "2026-01-00 00:00:00", "2026-01-01T00:00:00"]
+    stamps += ["%04d-%02d-%02d %02d:%02d:%02d" % (rng.randint(0, 9999), rng.randint(0, 13), rng.randint(0, 32),
+                                                  rng.randint(0, 25), rng.randint(0, 61), rng.randint(0, 61))
+               for _ in range(5000)]
+    got = server._parse_epochs(np.array([s.encode() for s in stamps], dtype="S19")).tolist()
+    for s, epoch in zip(stamps, got):
+        try:
+            want = int(datetime.strptime(s, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            want = server.NO_TS
+        assert epoch == want, s
+
+def test_top_k_keeps_first_seen_order_on_ties(tmp_path):
+    words = ["".join(random.Random(i).choices("abcdefghijklmnopqrstuvwxyz", k=12)) for i in range(1000)]
+    lines = [f"ERROR {w} {w[::-1]} {w[3:]}{w[:3]}" for w in words]
+    result = server.cluster_errors(write_log(tmp_path, lines), threshold=1.0, top_k=3)
+    assert [c["count"] for c in result["clusters"]] == [1, 1, 1]
+    assert [c["examples"] for c in result["clusters"]] == [[line] for line in lines[:3]]
+
+def test_examples_stay_inside_their_cluster(tmp_path):
+    redis = "2026-02-18 10:02:%02d ERROR Timeout connecting to redis at 10.0.0.%d:6379 request_id=req-%03d"
+    lines = ["2026-02-18 10:01:00 FATAL Service shutting down due to disk pressure node=worker-3"]
+    lines += [redis % (i, i, i) for i in range(5)]
+    result = server.cluster_errors(write_log(tmp_path, lines), top_k=10, examples_each=3)
+    by_rep = {c["rep"]: c for c in result["clusters"]}
+    disk = by_rep[original_normalize(lines[0])]
+    assert disk["count"] == 1 and disk["examples"] == lines[:1]
+    timeouts = by_rep[original_normalize(lines[1])]
+    assert timeouts["count"] == 5 and timeouts["examples"] == lines[1:4]
+
+@pytest.mark.parametrize("lines", [
+    ["2026-02-18 10:00:00 INFO ok", "2026-02-18 10:00:01 INFO " + "x" * server.HINT_WINDOW + " exception"],
+    ["2026-02-18 10:00:00 INFO ok"] * 37449 + ["2026-02-18 10:00:01 INFO payload timeout"],
+    ["job " + "y" * (server.HINT_WINDOW + 1) + " failed"],
+])
+def test_lines_crossing_a_hint_window(tmp_path, lines):
+    path = tmp_path / "big.log"
+    path.write_text("\n".join(lines))
+    assert path.stat().st_size > server.HINT_WINDOW
+    ix = server._log_index_cached(*server.file_key(str(path)))
+    assert ix.errorish.tolist() == [server.is_errorish(line) for line in lines]
+
+def test_growing_log_keeps_only_its_newest_index(tmp_path):
+    path = write_log(tmp_path, ["2026-02-18 10:00:00 ERROR a"])
+    for i in range(1, 4):
+        with open(path, "a") as f:
+            f.write("2026-02-18 10:00:01 INFO b\n")
+        os.utime(path, ns=(10**18 + i, 10**18 + i))
+        assert server.analyze_levels(path)["level_counts"] == {"INFO": i, "ERROR": 1}
+        key = server.file_key(path)
+        assert server._log_indexes[key[0]][0] == key[1:]
+
+def test_concurrent_cold_calls_build_the_index_once(tmp_path, monkeypatch):
+    path = write_log(tmp_path, ["2026-02-18 10:00:00 ERROR Timeout connecting to redis"] * 1000)
+    builds = []
+    build = server._build_log_index
+
+    def counted(*args):
+        builds.append(args)
+        time.sleep(0.2)
+        return build(*args)
+
+    monkeypatch.setattr(server, "_build_log_index", counted)
+    calls = [
+        lambda: server.analyze_levels(path),
+        lambda: server.cluster_errors(path),
+        lambda: server.make_graph(path, str(tmp_path / "levels.svg")),
+    ]
+    with ThreadPoolExecutor(len(calls)) as pool:
+        for future in [pool.submit(call) for call in calls]:
+            future.result()
+    assert len(builds) == 1